@@ -4,37 +4,52 @@
 IPMI 风扇自动调速脚本
 
 功能概述:
-1. 定期读取所有含 "Temp" 的传感器温度值（通过 `ipmitool sensor`）。
+1. 定期读取温度传感器读数（通过 `ipmitool sdr type Temperature`，
+   不支持时回退为 `ipmitool sensor` 中所有含 "Temp" 的传感器）。
 2. 取最高温度作为当前散热决策依据。
 3. 按温度区间设置固定风扇占空比（先关闭自动，再发送 RAW 命令）。
 4. 支持夜间时间段对风扇速度进行上限封顶（可跨越午夜）。
-5. 使用 APScheduler 定时调度。
+5. 基于 asyncio 运行，按单调时钟定时轮询，温度稳定时自动拉长轮询间隔。
 
 注意：
 - RAW 命令适用于常见 Supermicro 等兼容机型，其他厂商可能不同。
 - 退出时可选择恢复自动模式（需取消代码中注释）。
 """
 
+import asyncio
+import atexit
+import math
 import os
+import queue
+import shutil
 import subprocess
+import sys
+import tempfile
 import time
 import re
 import logging
 from typing import List
 from datetime import datetime
-from apscheduler.schedulers.blocking import BlockingScheduler
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 
 # ---------------- 基本用户配置区域 ----------------
 IPMI_HOST = "192.168.1.100"      # BMC / IPMI 地址
 IPMI_USER = "ADMIN"              # 用户名
 IPMI_PASSWORD = "PASSWORD"       # 密码
 INTERVAL_SECONDS = 30            # 轮询间隔秒
+# 自适应轮询：风扇目标转速连续不变时间隔逐次翻倍，直到 MAX_INTERVAL_SECONDS
+ADAPTIVE_INTERVAL_ENABLED = True
+MAX_INTERVAL_SECONDS = 300       # 自适应轮询最大间隔秒
+TEMP_DELTA_RESET = 3             # 相邻两次温差超过该值(°C)时恢复基础间隔
 IPMITOOL_CMD = "ipmitool"        # 若已在 PATH 中可直接用 ipmitool
+IPMI_TIMEOUT_SECONDS = 15        # 单条 ipmitool 命令超时秒
+# 使用常驻 `ipmitool shell` 复用同一个 IPMI 会话（避免每条命令重新握手），
+# 超时或异常时自动重启并单独执行该次命令，连续失败多次后不再使用 shell
+IPMI_PERSISTENT_SESSION = True
 # --------------------------------------------------
 
 # ------------- 温度, 风扇转速百分比策略 -------------
-# (温度下限, 风扇百分比) 规则从高到低判断
+# (温度下限, 风扇百分比) 规则从高到低判断，温度下限按整数摄氏度填写
 TEMP_SPEED_RULES = [
     (70, 40),
     (65, 35),
@@ -46,6 +61,8 @@ TEMP_SPEED_RULES = [
 ]
 MIN_PERCENT = 0
 MAX_PERCENT = 100
+# 档位切换滞回(°C)：温度需越过区间边界该幅度才切换档位，避免在边界附近来回切换；0 表示不启用
+TEMP_HYSTERESIS = 1.5
 # --------------------------------------------------
 
 # ---------------- 夜间限速配置 --------------------
@@ -70,15 +87,74 @@ LOG_USE_UTC = False       # True 表示按 UTC 午夜切割
 
 # 全局 logger
 logger = logging.getLogger("ipmi_fan")
+# 后台日志写出线程（控制台与文件 Handler 挂在其上）
+_log_listener: QueueListener | None = None
 
 # 上次设置的风扇转速百分比，用于避免重复下发相同指令
 _last_set_speed: int | None = None
 
+# 自适应轮询状态：下次轮询间隔、目标转速连续不变次数、上次决策结果
+_next_interval = INTERVAL_SECONDS
+_stable_count = 0
+_last_decision: int | None = None
+_last_temp: float | None = None
+
+# BMC 是否已处于手动风扇模式，避免每次设置转速都重复关闭自动模式
+_manual_mode = False
+
+# BMC 是否支持 `sdr type Temperature`，不支持时回退到 `sensor` 全量读取。
+# sdr 连续失败（未读到任何温度，而 sensor 成功）达到 _SDR_FAILURE_LIMIT 次才判定为不支持，避免偶发失败导致永久降级
+_sdr_supported = True
+_sdr_failures = 0
+_SDR_FAILURE_LIMIT = 3
+
+# 常驻 ipmitool shell 子进程、其 stderr 收集任务及互斥锁（同一时刻只执行一条命令）
+_shell: asyncio.subprocess.Process | None = None
+_shell_stderr_task: asyncio.Task | None = None
+_shell_stderr = bytearray()
+_shell_lock = asyncio.Lock()
+# shell 中用 echo 输出的分隔标记，用于判断一条命令的输出结束
+_SHELL_SENTINEL = "__IPMI_FAN_END__"
+_SHELL_PROMPT = "ipmitool> "
+# 分隔标记到达后等待 stderr 收齐：stdout 与 stderr 两个管道之间没有顺序保证，
+# 等到 stderr 在一个静默窗口内不再增长为止（总等待有上限），单位秒
+_SHELL_STDERR_QUIET = 0.05
+_SHELL_STDERR_MAX_WAIT = 0.5
+# shell 连续超时 / 异常达到该次数后停用常驻 shell，改为每条命令单独执行；
+# shell 误判失败（stderr 有输出但单独执行成功）累计达到该次数同样停用（不因其他命令成功而清零）
+_SHELL_FAILURE_LIMIT = 3
+_shell_failures = 0
+_shell_misjudged = 0
+_shell_disabled = False
+
+# ipmitool / stdbuf 的绝对路径（启动时解析一次，避免每次启动子进程都按 PATH 查找）。
+# 绝对路径且 close_fds=False 时 subprocess 可走 posix_spawn 快速路径，避免 fork 复制页表；
+# Python 创建的文件描述符默认不可继承，不会泄漏给子进程。
+# 找不到时得到的路径不存在，由 main() 启动检查报错。
+_IPMITOOL_PATH = os.path.abspath(shutil.which(IPMITOOL_CMD) or IPMITOOL_CMD)
+_STDBUF_PATH = shutil.which("stdbuf")
+# ipmitool 公共参数（配置常量，启动时拼接一次，每条命令只追加子命令参数）
+_IPMI_BASE = (_IPMITOOL_PATH, "-I", "lanplus", "-H", IPMI_HOST, "-U", IPMI_USER, "-P", IPMI_PASSWORD)
+
+# 关闭 / 开启 BMC 自动风扇模式的 RAW 命令
+_RAW_DISABLE_AUTO = ["raw", "0x30", "0x30", "0x01", "0x00"]
+_RAW_ENABLE_AUTO = ["raw", "0x30", "0x30", "0x01", "0x01"]
+
+# 温度行匹配（预编译，一次 finditer 扫描整段输出，避免逐行 split/strip）
+# sensor 格式: 名称含 temp 的行，取第 2 列开头的数值
+# （名称过滤在正则内按字符忽略大小写比较，不再为每行生成 lower() 副本）
+_SENSOR_LINE_RE = re.compile(r"^[^|\n]*(?i:temp)[^|\n]*\|\s*(-?\d+(?:\.\d+)?)(?![\w.])", re.MULTILINE)
+# sdr 格式: 取第 5 列开头的数值，如 "CPU Temp | 01h | ok | 3.1 | 42 degrees C"
+# 两者的数值后都不能紧跟字母数字或小数点，排除 "0x00" 这类离散传感器状态值
+_SDR_LINE_RE = re.compile(r"^(?:[^|\n]*\|){4}\s*(-?\d+(?:\.\d+)?)(?![\w.])", re.MULTILINE)
+
 
 def setup_logging():
     """
     配置日志系统：控制台 + 每日切割文件。
+    日志记录先进入队列，由后台线程写出，调速流程不会因写盘或切割日志而阻塞。
     """
+    global _log_listener
     if not os.path.isdir(LOG_DIR):
         os.makedirs(LOG_DIR, exist_ok=True)
 
@@ -108,54 +184,258 @@ def setup_logging():
     fh.setLevel(LOG_LEVEL)
     fh.setFormatter(fmt)
 
-    # 避免重复添加（脚本重复调用时）
-    if not logger.handlers:
-        logger.addHandler(sh)
-        logger.addHandler(fh)
-    else:
-        # 清理旧的再添加（防止二次导入）
-        logger.handlers.clear()
-        logger.addHandler(sh)
-        logger.addHandler(fh)
+    # 重复调用时先停止旧的后台线程，写完已排队的日志
+    if _log_listener is not None:
+        _log_listener.stop()
+        atexit.unregister(_log_listener.stop)
+
+    log_queue = queue.Queue(-1)
+    _log_listener = QueueListener(log_queue, sh, fh, respect_handler_level=True)
+    _log_listener.start()
+    # 退出时写完队列中剩余日志
+    atexit.register(_log_listener.stop)
+
+    # 避免重复添加（清理旧的再添加，防止二次导入）
+    logger.handlers.clear()
+    logger.addHandler(QueueHandler(log_queue))
 
 
-def run_ipmitool(args: List[str]) -> subprocess.CompletedProcess:
+async def _run_ipmitool_once(args: List[str]) -> subprocess.CompletedProcess:
     """
-    统一执行 ipmitool 命令。
-    返回 subprocess.CompletedProcess，失败不抛异常但可查看 returncode / stderr。
+    单独启动一个 ipmitool 进程执行命令。
     """
     try:
-        result = subprocess.run(
-            [IPMITOOL_CMD, "-I", "lanplus", "-H", IPMI_HOST, "-U", IPMI_USER, "-P", IPMI_PASSWORD] + args,
-            text=True,
-            capture_output=True,
-            timeout=15
+        proc = await asyncio.create_subprocess_exec(
+            *_IPMI_BASE, *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            close_fds=False
         )
-        return result
-    except subprocess.TimeoutExpired as e:
-        logger.error(f"ipmitool 命令超时: {e}")
-        return subprocess.CompletedProcess(args, 1, "", "timeout")
     except Exception as e:
         logger.error(f"执行 ipmitool 异常: {e}")
         return subprocess.CompletedProcess(args, 1, "", str(e))
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=IPMI_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        logger.error(f"ipmitool 命令超时: {' '.join(args)} ({IPMI_TIMEOUT_SECONDS} 秒)")
+        return subprocess.CompletedProcess(args, 1, "", "timeout")
+    return subprocess.CompletedProcess(
+        args, proc.returncode,
+        stdout.decode(errors="replace"), stderr.decode(errors="replace")
+    )
 
 
-def disable_auto():
-    res = run_ipmitool(["raw", "0x30", "0x30", "0x01", "0x00"])
-    if res.returncode != 0:
-        logger.warning(f"关闭自动模式失败: {res.stderr.strip()}")
+async def _run_ipmitool_exec_file(commands: List[List[str]]) -> subprocess.CompletedProcess:
+    """
+    把多条命令写入临时文件，用一个 ipmitool 进程 (`ipmitool exec <file>`) 依次执行。
+    """
+    try:
+        with tempfile.NamedTemporaryFile("w", suffix=".ipmi", delete=False) as f:
+            f.write("".join(" ".join(args) + "\n" for args in commands))
+    except OSError as e:
+        logger.error(f"写入 ipmitool 命令文件失败: {e}")
+        return subprocess.CompletedProcess(["exec"], 1, "", str(e))
+    try:
+        res = await _run_ipmitool_once(["exec", f.name])
+    finally:
+        os.unlink(f.name)
+    # exec 只返回最后一条命令的退出码，前面命令的失败只体现在 stderr
+    if res.returncode == 0 and res.stderr.strip():
+        res.returncode = 1
+    return res
+
+
+async def _collect_shell_stderr(proc: asyncio.subprocess.Process):
+    while line := await proc.stderr.readline():
+        _shell_stderr.extend(line)
+
+
+async def start_shell():
+    """
+    启动常驻 `ipmitool shell` 子进程（已在运行则不重复启动）。
+    """
+    global _shell, _shell_stderr_task
+    if _shell is not None and _shell.returncode is None:
+        return
+    cmd = _IPMI_BASE + ("shell",)
+    # stdout 为管道时 ipmitool 会整块缓冲，借助 stdbuf 改为行缓冲以便及时读到分隔标记
+    if _STDBUF_PATH:
+        cmd = (_STDBUF_PATH, "-oL") + cmd
+    _shell = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        close_fds=False
+    )
+    _shell_stderr_task = asyncio.create_task(_collect_shell_stderr(_shell))
+    logger.info("已启动常驻 ipmitool shell (pid=%d)", _shell.pid)
+
+    # 等 shell 就绪并丢弃启动阶段的 stderr（如建立 lanplus 会话时的警告），避免算到第一条命令头上
+    _shell_stderr.clear()
+    _shell.stdin.write(f"echo {_SHELL_SENTINEL}\n".encode())
+    await _shell.stdin.drain()
+    await asyncio.wait_for(_read_until_sentinel(_shell), timeout=IPMI_TIMEOUT_SECONDS)
+    await _wait_shell_stderr_quiet()
+    if _shell_stderr.strip():
+        logger.debug("ipmitool shell 启动输出: %s", _shell_stderr.decode(errors="replace").strip())
+    _shell_stderr.clear()
+
+
+async def stop_shell():
+    """
+    关闭常驻 ipmitool shell 子进程。
+    """
+    global _shell, _shell_stderr_task
+    proc, _shell = _shell, None
+    task, _shell_stderr_task = _shell_stderr_task, None
+    if proc is None:
+        return
+    try:
+        proc.stdin.close()
+        await asyncio.wait_for(proc.wait(), timeout=3)
+    except Exception:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    if task is not None:
+        task.cancel()
+
+
+def _strip_prompt(line: str) -> str:
+    while line.startswith(_SHELL_PROMPT):
+        line = line[len(_SHELL_PROMPT):]
+    return line
+
+
+async def _read_until_sentinel(proc: asyncio.subprocess.Process) -> List[str]:
+    lines = []
+    while True:
+        raw = await proc.stdout.readline()
+        if not raw:
+            raise RuntimeError("ipmitool shell 已退出")
+        line = _strip_prompt(raw.decode(errors="replace").rstrip("\r\n"))
+        if line == _SHELL_SENTINEL:
+            return lines
+        lines.append(line)
+
+
+async def _wait_shell_stderr_quiet():
+    """
+    等待 shell 的 stderr 收齐（见 _SHELL_STDERR_QUIET / _SHELL_STDERR_MAX_WAIT）。
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + _SHELL_STDERR_MAX_WAIT
+    while True:
+        size = len(_shell_stderr)
+        await asyncio.sleep(_SHELL_STDERR_QUIET)
+        if len(_shell_stderr) == size or loop.time() >= deadline:
+            break
+
+
+async def _shell_exec(commands: List[List[str]]) -> subprocess.CompletedProcess:
+    """
+    通过常驻 shell 执行一组命令（一次写入），读取 stdout 直到分隔标记。
+    shell 无法返回单条命令的退出码，以这组命令是否输出 stderr 判断成败。
+    超时或子进程退出时抛出异常，由调用方重启 shell。
+    """
+    proc = _shell
+    command_lines = [" ".join(args) for args in commands]
+    _shell_stderr.clear()
+    proc.stdin.write("".join(f"{line}\n" for line in command_lines + [f"echo {_SHELL_SENTINEL}"]).encode())
+    await proc.stdin.drain()
+
+    lines = await asyncio.wait_for(_read_until_sentinel(proc), timeout=IPMI_TIMEOUT_SECONDS)
+    await _wait_shell_stderr_quiet()
+
+    # 去掉可能被回显的命令行本身
+    echoed = set(command_lines) | {f"echo {_SHELL_SENTINEL}"}
+    stdout = "\n".join(l for l in lines if l.strip() not in echoed)
+    stderr = _strip_prompt(_shell_stderr.decode(errors="replace"))
+    return subprocess.CompletedProcess(command_lines, 1 if stderr.strip() else 0, stdout, stderr)
+
+
+async def run_ipmitool(args: List[str]) -> subprocess.CompletedProcess:
+    """
+    统一执行 ipmitool 命令。
+    返回 subprocess.CompletedProcess，失败不抛异常但可查看 returncode / stderr。
+    """
+    return await run_ipmitool_batch([args])
 
 
-def enable_auto():
-    res = run_ipmitool(["raw", "0x30", "0x30", "0x01", "0x01"])
+async def run_ipmitool_batch(commands: List[List[str]]) -> subprocess.CompletedProcess:
+    """
+    依次执行多条 ipmitool 命令，尽量只产生一次 BMC 交互：
+    常驻 shell 下一次写入全部命令，否则用 `ipmitool exec` 在一个进程内执行。
+    任一命令失败即整体视为失败。
+    shell 判定失败时会再单独执行一次，以其退出码为准。
+    """
+    global _shell_failures, _shell_misjudged
+
+    if not IPMI_PERSISTENT_SESSION or _shell_disabled:
+        return await _run_commands_once(commands)
+
+    async with _shell_lock:
+        try:
+            await start_shell()
+            res = await _shell_exec(commands)
+        except Exception as e:
+            # 看门狗：超时或 shell 无法启动 / 已退出时重启 shell，本次命令回退为单独执行
+            if isinstance(e, asyncio.TimeoutError):
+                logger.error(f"ipmitool shell 命令超时: {'; '.join(' '.join(a) for a in commands)}")
+            else:
+                logger.warning("ipmitool shell 异常: %s", e)
+            await stop_shell()
+            _shell_failures += 1
+            if _shell_failures >= _SHELL_FAILURE_LIMIT:
+                _disable_shell(f"连续失败 {_shell_failures} 次")
+            return await _run_commands_once(commands)
+        if res.returncode == 0:
+            _shell_failures = 0
+            return res
+
+        # shell 只能按 stderr 判断成败：重启 shell（会话可能已被 BMC 超时回收），
+        # 并单独执行一次以退出码为准
+        await stop_shell()
+        once = await _run_commands_once(commands)
+        if once.returncode == 0:
+            # 单独执行成功，说明是 shell 误判（如 stderr 上的无害警告），计入 shell 失败次数
+            logger.warning("ipmitool shell 判定失败但单独执行成功: %s", res.stderr.strip())
+            _shell_misjudged += 1
+            if _shell_misjudged >= _SHELL_FAILURE_LIMIT:
+                _disable_shell(f"误判失败 {_shell_misjudged} 次")
+        return once
+
+
+def _disable_shell(reason: str):
+    global _shell_disabled
+    logger.warning("ipmitool shell %s，停用常驻 shell，改为每条命令单独执行", reason)
+    _shell_disabled = True
+
+
+async def _run_commands_once(commands: List[List[str]]) -> subprocess.CompletedProcess:
+    if len(commands) == 1:
+        return await _run_ipmitool_once(commands[0])
+    return await _run_ipmitool_exec_file(commands)
+
+
+async def enable_auto():
+    global _manual_mode
+    res = await run_ipmitool(_RAW_ENABLE_AUTO)
     if res.returncode != 0:
-        logger.warning(f"开启自动模式失败: {res.stderr.strip()}")
+        logger.warning("开启自动模式失败: %s", res.stderr.strip())
+    _manual_mode = False
 
 
-def set_speed(percent: int):
+async def set_speed(percent: int) -> bool:
     """
     设置风扇转速百分比（原始命令模式）。
+    仅在尚未进入手动模式时关闭自动模式，并与设置转速合并为一次下发；
+    写入失败后下次会重新关闭。
     """
+    global _manual_mode
     original = percent
     if percent < MIN_PERCENT:
         percent = MIN_PERCENT
@@ -163,57 +443,146 @@ def set_speed(percent: int):
         percent = MAX_PERCENT
 
     if original != percent:
-        logger.debug(f"修正风扇百分比 {original}% -> {percent}% (限制范围 {MIN_PERCENT}-{MAX_PERCENT})")
+        logger.debug("修正风扇百分比 %d%% -> %d%% (限制范围 %d-%d)", original, percent, MIN_PERCENT, MAX_PERCENT)
 
-    disable_auto()  # 先关闭自动模式
     hex_byte = f"0x{percent:02x}"
-    res = run_ipmitool(["raw", "0x30", "0x30", "0x02", "0xff", hex_byte])
+    commands = [["raw", "0x30", "0x30", "0x02", "0xff", hex_byte]]
+    if not _manual_mode:
+        commands.insert(0, _RAW_DISABLE_AUTO)  # 先关闭自动模式
+    res = await run_ipmitool_batch(commands)
     if res.returncode != 0:
-        logger.warning(f"设置速度 {percent}% 失败: {res.stderr.strip()}")
-    else:
-        logger.info(f"已设置风扇速度: {percent}% ({hex_byte})")
+        logger.warning("设置速度 %d%% 失败: %s", percent, res.stderr.strip())
+        # BMC 可能已重置回自动模式，下次重新关闭
+        _manual_mode = False
+        return False
+    _manual_mode = True
+    logger.info("已设置风扇速度: %d%% (%s)", percent, hex_byte)
+    return True
 
 
-def parse_sensor_output(output: str) -> List[float]:
+def _max_temp(pattern: re.Pattern, output: str) -> float | None:
     """
-    从 ipmitool sensor 输出中提取带 'Temp' 的温度值。
+    扫描输出的同时求最高有效温度，不生成中间列表；无有效数据时返回 None。
     """
-    temps = []
-    lines = output.strip().splitlines()
-    for line in lines:
-        if "temp" not in line.lower():
-            continue
-        parts = line.split("|")
-        if len(parts) < 2:
-            continue
-        field = parts[1].strip()
-        m = re.search(r"(-?\d+(?:\.\d+)?)", field)
-        if m:
-            try:
-                val = float(m.group(1))
-                if -50 < val < 200:
-                    temps.append(val)
-            except ValueError:
-                continue
-    return temps
+    cur_max = None
+    for m in pattern.finditer(output):
+        val = float(m.group(1))
+        if -50 < val < 200 and (cur_max is None or val > cur_max):
+            cur_max = val
+    return cur_max
+
+
+def parse_sensor_output(output: str) -> float | None:
+    """
+    从 ipmitool sensor 输出中提取带 'Temp' 的最高温度值。
+    """
+    return _max_temp(_SENSOR_LINE_RE, output)
+
+
+def parse_sdr_output(output: str) -> float | None:
+    """
+    从 ipmitool sdr type Temperature 输出中提取最高温度值。
+    行格式示例: CPU Temp | 01h | ok | 3.1 | 42 degrees C
+    """
+    return _max_temp(_SDR_LINE_RE, output)
 
 
-def get_temps() -> List[float]:
-    res = run_ipmitool(["sensor"])
+async def get_max_temp() -> float | None:
+    """
+    读取当前最高温度，无有效数据时返回 None。
+    优先只读取温度类 SDR，BMC 不支持时回退到 `ipmitool sensor`。
+    """
+    global _sdr_supported, _sdr_failures
+
+    sdr_failed = False
+    if _sdr_supported:
+        res = await run_ipmitool(["sdr", "type", "Temperature"])
+        temp = parse_sdr_output(res.stdout)
+        # 个别传感器读取失败时 ipmitool 也会报错，只要读到了温度就视为 sdr 可用
+        if res.returncode == 0 or temp is not None:
+            _sdr_failures = 0
+            return temp
+        logger.warning("读取温度 SDR 失败，本次回退到 sensor: %s", res.stderr.strip())
+        sdr_failed = True
+
+    res = await run_ipmitool(["sensor"])
     if res.returncode != 0:
         logger.error(f"读取传感器失败: {res.stderr.strip()}")
-        return []
+        return None
+    if sdr_failed:
+        # sdr 多次连续失败而 sensor 成功，说明 BMC 不支持 sdr type，后续直接使用 sensor
+        _sdr_failures += 1
+        if _sdr_failures >= _SDR_FAILURE_LIMIT:
+            logger.info("sdr type Temperature 连续失败 %d 次，后续改用 sensor 读取", _sdr_failures)
+            _sdr_supported = False
     return parse_sensor_output(res.stdout)
 
 
-def choose_speed_by_temp(temp: float) -> int:
+def _bucket_by_rules(temp: float) -> int:
     """
-    按 TEMP_SPEED_RULES 从上到下匹配第一个 temp >= 下限 的规则。
+    按 TEMP_SPEED_RULES 从上到下匹配第一个 temp >= 下限 的规则，返回规则下标。
     """
-    for lower_bound, pct in TEMP_SPEED_RULES:
+    for idx, (lower_bound, _) in enumerate(TEMP_SPEED_RULES):
         if temp >= lower_bound:
-            return pct
-    return TEMP_SPEED_RULES[-1][1]
+            return idx
+    return len(TEMP_SPEED_RULES) - 1
+
+
+# 查找表覆盖的温度范围，与解析时的有效温度范围 (-50, 200) 一致
+_LUT_MIN_TEMP = -50
+_LUT_MAX_TEMP = 200
+_BUCKET_LUT = b""
+
+# 当前所处档位（TEMP_SPEED_RULES 下标），用于滞回判断
+_last_bucket_idx: int | None = None
+
+# 调速决策缓存: (最高温度, 当前档位, 是否夜间) -> (新档位, 最终风扇百分比)
+# 决策只依赖这三项，温度稳定时直接复用结果，跳过档位判断与相关日志
+_decision_cache: dict[tuple[float, int | None, bool], tuple[int, int]] = {}
+_DECISION_CACHE_MAX = 4096
+
+
+def build_speed_lut():
+    """
+    按 TEMP_SPEED_RULES 预先计算每个整数温度对应的规则下标。
+    运行时修改 TEMP_SPEED_RULES 后需重新调用。
+    """
+    global _BUCKET_LUT, _last_bucket_idx
+    _BUCKET_LUT = bytes(_bucket_by_rules(t) for t in range(_LUT_MIN_TEMP, _LUT_MAX_TEMP + 1))
+    _last_bucket_idx = None
+    _decision_cache.clear()
+
+
+build_speed_lut()
+
+
+def _lookup_bucket(temp: float) -> int:
+    idx = math.floor(temp) - _LUT_MIN_TEMP
+    return _BUCKET_LUT[min(len(_BUCKET_LUT) - 1, max(0, idx))]
+
+
+def choose_bucket(temp: float, current_idx: int | None = None) -> int:
+    """
+    查表得到温度对应的档位（规则下标，越小温度越高），并按 TEMP_HYSTERESIS 做滞回：
+      - 升档需 temp >= 目标档下限 + 滞回
+      - 降档需 temp < 当前档下限 - 滞回
+    """
+    target = _lookup_bucket(temp)
+    if current_idx is None or target == current_idx:
+        return target
+
+    up = _lookup_bucket(temp - TEMP_HYSTERESIS)
+    if up < current_idx:
+        return up
+    down = _lookup_bucket(temp + TEMP_HYSTERESIS)
+    if down > current_idx:
+        return down
+
+    logger.info(
+        "温度 %.1f°C 处于档位边界滞回区 (±%s°C)，保持 %d%%，不切换到 %d%%",
+        temp, TEMP_HYSTERESIS, TEMP_SPEED_RULES[current_idx][1], TEMP_SPEED_RULES[target][1]
+    )
+    return current_idx
 
 
 def parse_hhmm(s: str):
@@ -227,98 +596,168 @@ def parse_hhmm(s: str):
         raise ValueError(f"时间格式错误: {s}，应为 HH:MM")
 
 
-def is_in_time_window(now: datetime, start_str: str, end_str: str) -> bool:
+def hhmm_to_minutes(s: str) -> int:
     """
-    判断当前时间是否处于 [start, end) 区间。
-    支持跨午夜：
-      - 若 start <= end：同日区间
-      - 若 start > end ：跨越午夜，例如 23:00 - 07:30
+    把 'HH:MM' 转换为当日分钟数。
     """
-    sh, sm = parse_hhmm(start_str)
-    eh, em = parse_hhmm(end_str)
-    start_minutes = sh * 60 + sm
-    end_minutes = eh * 60 + em
-    now_minutes = now.hour * 60 + now.minute
+    hour, minute = parse_hhmm(s)
+    return hour * 60 + minute
 
-    if start_minutes == end_minutes:
-        # 全日均匹配
-        return True
 
-    if start_minutes < end_minutes:
-        # 不跨夜
-        return start_minutes <= now_minutes < end_minutes
-    else:
-        # 跨夜：只要 >= start 或 < end
-        return now_minutes >= start_minutes or now_minutes < end_minutes
+# 夜间区间的起止分钟数（配置常量，导入时解析一次）
+_NIGHT_START_MIN = hhmm_to_minutes(NIGHT_START)
+_NIGHT_END_MIN = hhmm_to_minutes(NIGHT_END)
+
+
+def is_in_time_window(now_minutes: int, start_minutes: int, end_minutes: int) -> bool:
+    """
+    判断当日分钟数 now_minutes 是否处于 [start, end) 区间。
+    按一天 1440 分钟取模统一处理同日区间与跨午夜区间（例如 23:00 - 07:30），
+    start == end 表示全日均匹配。
+    """
+    span = (end_minutes - start_minutes) % 1440
+    return span == 0 or (now_minutes - start_minutes) % 1440 < span
+
+
+def is_night(now: datetime) -> bool:
+    """
+    夜间限速已启用且 now 处于夜间区间。
+    """
+    return NIGHT_LIMIT_ENABLED and is_in_time_window(now.hour * 60 + now.minute, _NIGHT_START_MIN, _NIGHT_END_MIN)
 
 
-def apply_night_limit(speed: int) -> int:
+def apply_night_limit(now: datetime, speed: int) -> int:
     """
-    若开启夜间限速，且当前处于夜间，则对风扇速度做上限封顶。
+    若开启夜间限速，且 now 处于夜间，则对风扇速度做上限封顶。
+    now 由调用方每轮取一次传入，避免重复获取当前时间。
     """
-    if not NIGHT_LIMIT_ENABLED:
-        return speed
-    now = datetime.now()
-    if is_in_time_window(now, NIGHT_START, NIGHT_END):
+    if is_night(now):
+        now_minutes = now.hour * 60 + now.minute
         if speed > NIGHT_MAX_PERCENT:
             #print(f"[INFO] 夜间限速生效: {speed}% -> {NIGHT_MAX_PERCENT}% (区间 {NIGHT_START}-{NIGHT_END})")
             logger.info(
-                f"夜间限速生效: {speed}% -> {NIGHT_MAX_PERCENT}% "
-                f"(区间 {NIGHT_START}-{NIGHT_END})"
+                "夜间限速生效: %d%% -> %d%% (当前 %02d:%02d, 区间 %s-%s)",
+                speed, NIGHT_MAX_PERCENT, now_minutes // 60, now_minutes % 60, NIGHT_START, NIGHT_END
             )
             return NIGHT_MAX_PERCENT
         else:
             #print(f"[DEBUG] 夜间限速已启用，但当前速度 {speed}% 未超过上限 {NIGHT_MAX_PERCENT}%")
             logger.debug(
-                f"夜间限速启用: 当前速度 {speed}% 未超过上限 {NIGHT_MAX_PERCENT}%"
+                "夜间限速启用: 当前速度 %d%% 未超过上限 %d%% (当前 %02d:%02d)",
+                speed, NIGHT_MAX_PERCENT, now_minutes // 60, now_minutes % 60
             )
     return speed
 
 
-def auto_config():
-    temps = get_temps()
-    if not temps:
-        logger.warning("未获取到有效温度数据，保持当前风扇状态。")
-        return
+def update_poll_interval(current_max: float | None, final_speed: int | None, applied: bool):
+    """
+    根据本次决策更新下次轮询间隔：
+      - 目标转速不变且已成功下发时间隔翻倍，最大 MAX_INTERVAL_SECONDS
+      - 目标转速变化、尚未成功下发、温度骤变或读取失败时恢复 INTERVAL_SECONDS
+    """
+    global _next_interval, _stable_count, _last_decision, _last_temp
 
-    global _last_set_speed
+    if not ADAPTIVE_INTERVAL_ENABLED:
+        _next_interval = INTERVAL_SECONDS
+        return
 
-    current_max = max(temps)
-    base_speed = choose_speed_by_temp(current_max)
-    logger.info(f"当前最高温度: {current_max:.1f}°C -> 策略目标风扇: {base_speed}%")
+    if (
+        current_max is None
+        or not applied
+        or final_speed != _last_decision
+        or (_last_temp is not None and abs(current_max - _last_temp) > TEMP_DELTA_RESET)
+    ):
+        _stable_count = 0
+    elif _next_interval < MAX_INTERVAL_SECONDS:
+        _stable_count += 1
+    _last_decision = final_speed
+    _last_temp = current_max
+
+    interval = min(MAX_INTERVAL_SECONDS, INTERVAL_SECONDS * 2 ** _stable_count)
+    if interval != _next_interval:
+        logger.info("轮询间隔调整: %s 秒 -> %s 秒", _next_interval, interval)
+    _next_interval = interval
+
+
+async def auto_config():
+    current_max = await get_max_temp()
+    if current_max is None:
+        logger.warning("未获取到有效温度数据，保持当前风扇状态。")
+        update_poll_interval(None, None, False)
+        return
 
-    final_speed = apply_night_limit(base_speed)
+    global _last_set_speed, _last_bucket_idx
+
+    now = datetime.now()  # 本轮决策统一使用的当前时间
+    key = (current_max, _last_bucket_idx, is_night(now))
+    decision = _decision_cache.get(key)
+    if decision is None:
+        bucket = choose_bucket(current_max, _last_bucket_idx)
+        base_speed = TEMP_SPEED_RULES[bucket][1]
+        logger.info("当前最高温度: %.1f°C -> 策略目标风扇: %d%%", current_max, base_speed)
+        decision = (bucket, apply_night_limit(now, base_speed))
+        if len(_decision_cache) >= _DECISION_CACHE_MAX:
+            _decision_cache.clear()
+        _decision_cache[key] = decision
+    else:
+        logger.debug("当前最高温度: %.1f°C，命中决策缓存 -> 目标风扇: %d%%", current_max, decision[1])
+    _last_bucket_idx, final_speed = decision
 
     if final_speed == _last_set_speed:
-        logger.info(f"风扇目标转速 {final_speed}% 未发生变化，跳过下发。")
-        return
+        logger.info("风扇目标转速 %d%% 未发生变化，跳过下发。", final_speed)
+    elif await set_speed(final_speed):
+        _last_set_speed = final_speed
+    # 下发失败时保持基础间隔，尽快重试
+    update_poll_interval(current_max, final_speed, final_speed == _last_set_speed)
 
-    set_speed(final_speed)
-    _last_set_speed = final_speed
 
-
-def main():
-    setup_logging()
+async def async_main():
     logger.info("IPMI 风扇自动调速脚本启动")
-    logger.info(f"轮询间隔: {INTERVAL_SECONDS} 秒, 目标主机: {IPMI_HOST}")
+    logger.info("轮询间隔: %s 秒, 目标主机: %s", INTERVAL_SECONDS, IPMI_HOST)
     if NIGHT_LIMIT_ENABLED:
-        logger.info(f"夜间限速启用: {NIGHT_START} - {NIGHT_END}, 最大 {NIGHT_MAX_PERCENT}%")
+        logger.info("夜间限速启用: %s - %s, 最大 %d%%", NIGHT_START, NIGHT_END, NIGHT_MAX_PERCENT)
     else:
         logger.info("夜间限速未启用")
-    scheduler = BlockingScheduler()
-    scheduler.add_job(
-        auto_config,
-        "interval",
-        seconds=INTERVAL_SECONDS,
-        max_instances=1,
-        coalesce=True
-    )
+    if IPMI_PERSISTENT_SESSION:
+        try:
+            await start_shell()
+        except Exception as e:
+            logger.warning("启动 ipmitool shell 失败，将按需重试: %s", e)
+    if ADAPTIVE_INTERVAL_ENABLED:
+        logger.info("自适应轮询启用: 最大间隔 %s 秒, 温差重置阈值 %s°C", MAX_INTERVAL_SECONDS, TEMP_DELTA_RESET)
     try:
-        auto_config()  # 立即执行一次
-        scheduler.start()
-    except (KeyboardInterrupt, SystemExit):
+        # 按单调时钟计算下次执行时间，不受系统时间调整影响；间隔由自适应轮询决定。首次立即执行
+        next_run = time.monotonic()
+        while True:
+            delay = next_run - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await auto_config()
+            except Exception:
+                logger.exception("调速任务执行异常")
+                # 异常时恢复基础间隔，尽快重试
+                update_poll_interval(None, None, False)
+            next_run += _next_interval
+            if next_run < time.monotonic():
+                # 执行耗时超过间隔时不补跑，从当前时间重新计时
+                next_run = time.monotonic() + _next_interval
+    except asyncio.CancelledError:
         logger.info("接收到退出信号，尝试恢复自动控制（可选）...")
-        # enable_auto()  # 若希望退出时恢复 BIOS 自动，请取消注释
+        # await enable_auto()  # 若希望退出时恢复 BIOS 自动，请取消注释
+        raise
+    finally:
+        await stop_shell()
+
+
+def main():
+    setup_logging()
+    if not (os.path.isfile(_IPMITOOL_PATH) and os.access(_IPMITOOL_PATH, os.X_OK)):
+        logger.error(f"未找到可执行的 ipmitool: {IPMITOOL_CMD}，请安装 ipmitool 或修改 IPMITOOL_CMD")
+        sys.exit(1)
+    try:
+        asyncio.run(async_main())
+    except (KeyboardInterrupt, SystemExit):
         logger.info("已退出。")
 
 
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+main.py 单元测试（python3 -m unittest）
+"""
+
+import unittest
+
+from main import hhmm_to_minutes, is_in_time_window, parse_sdr_output, parse_sensor_output
+
+
+class IsInTimeWindowTest(unittest.TestCase):
+
+    def test_same_day(self):
+        start, end = hhmm_to_minutes("09:00"), hhmm_to_minutes("17:00")
+        self.assertTrue(is_in_time_window(hhmm_to_minutes("09:00"), start, end))
+        self.assertTrue(is_in_time_window(hhmm_to_minutes("16:59"), start, end))
+        self.assertFalse(is_in_time_window(hhmm_to_minutes("17:00"), start, end))
+        self.assertFalse(is_in_time_window(hhmm_to_minutes("08:59"), start, end))
+
+    def test_cross_midnight(self):
+        start, end = hhmm_to_minutes("23:00"), hhmm_to_minutes("07:30")
+        self.assertTrue(is_in_time_window(hhmm_to_minutes("23:00"), start, end))
+        self.assertTrue(is_in_time_window(hhmm_to_minutes("00:00"), start, end))
+        self.assertTrue(is_in_time_window(hhmm_to_minutes("07:29"), start, end))
+        self.assertFalse(is_in_time_window(hhmm_to_minutes("07:30"), start, end))
+        self.assertFalse(is_in_time_window(hhmm_to_minutes("22:59"), start, end))
+
+    def test_equal_start_end_matches_whole_day(self):
+        start = end = hhmm_to_minutes("12:00")
+        for now in (0, hhmm_to_minutes("11:59"), start, hhmm_to_minutes("23:59")):
+            self.assertTrue(is_in_time_window(now, start, end))
+
+
+SDR_SAMPLE = """\
+CPU1 Temp        | 01h | ok  |  3.1 | 45 degrees C
+CPU2 Temp        | 02h | ns  |  3.2 | No Reading
+PCH Temp         | 0Ah | ok  |  7.1 | 52 degrees C
+System Temp      | 0Bh | ok  |  7.2 | 31 degrees C
+Peripheral Temp  | 0Ch | ok  |  7.3 | 210 degrees C
+DIMM Temp        | 0Dh | ok  |  7.4 | -60 degrees C
+CPU1 Temp Status | 0Eh | ok  |  3.1 | 0x00
+"""
+
+SENSOR_SAMPLE = """\
+CPU1 Temp        | 44.000     | degrees C  | ok    | 0.000     | 0.000     | 0.000     | 95.000    | 100.000   | 100.000
+CPU2 Temp        | na         | degrees C  | na    | 0.000     | 0.000     | 0.000     | 95.000    | 100.000   | 100.000
+SYSTEM TEMP      | 57.500     | degrees C  | ok    | -9.000    | -7.000    | -5.000    | 80.000    | 85.000    | 90.000
+Peripheral Temp  | 250.000    | degrees C  | ok    | -9.000    | -7.000    | -5.000    | 80.000    | 85.000    | 90.000
+DIMM Temp        | -55.000    | degrees C  | ok    | -9.000    | -7.000    | -5.000    | 80.000    | 85.000    | 90.000
+CPU1 Temp Status | 0x0        | discrete   | 0x8000| na        | na        | na        | na        | na        | na
+FAN1             | 1500.000   | RPM        | ok    | 300.000   | 500.000   | 700.000   | 25300.000 | 25400.000 | 25500.000
+"""
+
+
+def _drop_sensors(output, *names):
+    """去掉指定名称的传感器行，只留下应被忽略的行"""
+    return "\n".join(line for line in output.splitlines() if line.split("|")[0].strip() not in names)
+
+
+class ParseSdrOutputTest(unittest.TestCase):
+
+    def test_max_valid_reading(self):
+        self.assertEqual(parse_sdr_output(SDR_SAMPLE), 52.0)
+
+    def test_skips_no_reading_out_of_range_and_discrete(self):
+        sample = _drop_sensors(SDR_SAMPLE, "CPU1 Temp", "PCH Temp", "System Temp")
+        self.assertIsNone(parse_sdr_output(sample))
+
+    def test_discrete_zero_not_parsed(self):
+        self.assertIsNone(parse_sdr_output("CPU1 Temp Status | 0Eh | ok  |  3.1 | 0x00\n"))
+
+    def test_empty_output(self):
+        self.assertIsNone(parse_sdr_output(""))
+
+
+class ParseSensorOutputTest(unittest.TestCase):
+
+    def test_max_valid_reading_case_insensitive(self):
+        # "SYSTEM TEMP" 为大写名称，也应计入
+        self.assertEqual(parse_sensor_output(SENSOR_SAMPLE), 57.5)
+
+    def test_skips_na_out_of_range_discrete_and_non_temp(self):
+        sample = _drop_sensors(SENSOR_SAMPLE, "CPU1 Temp", "SYSTEM TEMP")
+        self.assertIsNone(parse_sensor_output(sample))
+
+    def test_negative_reading(self):
+        self.assertEqual(parse_sensor_output("Inlet Temp | -5.000 | degrees C | ok\n"), -5.0)
+
+
+if __name__ == "__main__":
+    unittest.main()